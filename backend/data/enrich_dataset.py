@@ -4,33 +4,26 @@ unstructured text (capabilities, equipment, services) for RAG/IDP purposes.
 We keep the real structured data (name, region, district, type, lat, lng, ownership)
 and add realistic unstructured fields for the hackathon.
 """
-import csv
-import json
-import random
-import hashlib
+import string
 from pathlib import Path
 
-random.seed(42)
+import numpy as np
+import orjson
+import pandas as pd
 
 DATA_DIR = Path(__file__).parent
 
-# Load Kaggle CSV
-kaggle_rows = []
-with open(DATA_DIR / "ghana_health_facilities_kaggle.csv") as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        kaggle_rows.append(row)
+# Root seed for every random draw: the column-wide generator and the
+# per-facility child streams (keyed by a hash of the facility name)
+SEED = 42
 
 # Filter to actual healthcare facilities (not directorates/training)
-FACILITY_TYPES = {
+FACILITY_TYPES = frozenset({
     "Hospital", "District Hospital", "Regional Hospital", "Teaching Hospital",
     "Psychiatric Hospital", "Municipal Hospital", "Metropolitan Hospital",
     "Polyclinic", "Health Centre", "Clinic", "clinic", "CHPS", "CPHS",
     "Maternity Home", "RCH", "Centre"
-}
-facilities_raw = [r for r in kaggle_rows if r["Type"] in FACILITY_TYPES]
-
-print(f"Filtered to {len(facilities_raw)} healthcare facilities from {len(kaggle_rows)} total rows")
+})
 
 # ── Templates for generating unstructured text ──
 
@@ -91,6 +84,14 @@ SERVICES_BY_TYPE = {
     "Psychiatric Hospital": ["Inpatient", "Outpatient", "Counseling", "Rehabilitation"],
 }
 
+# Frozen (pool, size) pairs so per-row sampling indexes into shared tuples
+EQUIPMENT_META = {t: (tuple(v), len(v)) for t, v in EQUIPMENT_BY_TYPE.items()}
+SPECIALTIES_META = {t: (tuple(v), len(v)) for t, v in SPECIALTIES_BY_TYPE.items()}
+SERVICES_META = {t: (tuple(v), len(v)) for t, v in SERVICES_BY_TYPE.items()}
+DEFAULT_EQUIPMENT = (("Basic First Aid",), 1)
+DEFAULT_SPECIALTIES = ((), 0)
+DEFAULT_SERVICES = (("Outpatient",), 1)
+
 BED_RANGES = {
     "Teaching Hospital": (500, 2000),
     "Regional Hospital": (150, 400),
@@ -133,7 +134,28 @@ STATUS_OPTIONS_GOOD = ["Fully Operational", "Operational"]
 STATUS_OPTIONS_MID = ["Operational - Limited Specialist Coverage", "Operational - Developing"]
 STATUS_OPTIONS_BAD = ["Operational - Resource Constrained", "Operational - Minimal Capacity", "Operational - Critical Capacity", "Operational - Severely Resource Constrained"]
 
-NORTHERN_REGIONS = {"Northern", "Upper East", "Upper West"}
+# Every possible last_inspection date (2023-2024, day 1-28), drawn by index
+INSPECTION_DATES = np.array(
+    [f"202{y}-{m:02d}-{d:02d}" for y in (3, 4) for m in range(1, 13) for d in range(1, 29)],
+    dtype=object,
+)
+
+# Status pool per bucket, indexed by 2 * is_northern + is_small
+STATUS_POOLS = (
+    STATUS_OPTIONS_GOOD,
+    STATUS_OPTIONS_GOOD + STATUS_OPTIONS_MID,
+    STATUS_OPTIONS_MID + STATUS_OPTIONS_BAD,
+    STATUS_OPTIONS_BAD,
+)
+
+NORTHERN_REGIONS = frozenset({"Northern", "Upper East", "Upper West"})
+
+# Type/ownership groups used by the text, notes and status rules
+SMALL_TYPES_CAP = frozenset({"CHPS", "CPHS", "Clinic", "clinic", "RCH", "Health Centre", "Maternity Home"})
+SMALL_TYPES_NOTES = frozenset({"CHPS", "CPHS", "Clinic", "clinic", "RCH", "Health Centre"})
+SMALL_TYPES_STATUS = frozenset({"CHPS", "Clinic", "clinic", "RCH", "Health Centre", "Maternity Home"})
+REFERRAL_TYPES = frozenset({"Teaching Hospital", "Regional Hospital"})
+FAITH_OWNERSHIP = frozenset({"CHAG", "Mission"})
 CAPABILITY_TEMPLATES_HOSPITAL = [
     "This {type} serves the {district} district in the {region} region. The facility provides {services_text}. Current bed capacity is {beds} with approximately {staff} healthcare workers. {equip_text} {challenge_text} {special_text}",
     "{name} is a {ownership}-owned {type} located in {town}, {region}. It offers services including {services_text}. The facility has {beds} beds and {staff} staff members. {equip_text} {challenge_text} {special_text}",
@@ -145,6 +167,24 @@ CAPABILITY_TEMPLATES_SMALL = [
     "This {type} in {town} serves the surrounding communities of {district}. {services_text}. Staff consists of {staff} health workers. {equip_text} {challenge_text}",
 ]
 
+
+def parse_template(template):
+    """Split a str.format template once into its literal fragments and field names."""
+    parsed = list(string.Formatter().parse(template))
+    return (
+        tuple(literal for literal, _, _, _ in parsed),
+        tuple(field or "" for _, field, _, _ in parsed),
+    )
+
+
+def render_template(parsed, values):
+    literals, fields = parsed
+    return "".join([literal + (values[field] if field else "") for literal, field in zip(literals, fields)])
+
+
+CAPABILITY_TEMPLATES_HOSPITAL_PARSED = [parse_template(t) for t in CAPABILITY_TEMPLATES_HOSPITAL]
+CAPABILITY_TEMPLATES_SMALL_PARSED = [parse_template(t) for t in CAPABILITY_TEMPLATES_SMALL]
+
 CHALLENGES_NORTHERN = [
     "The facility faces significant challenges including chronic understaffing, limited specialist coverage, and poor road infrastructure for referrals.",
     "Staff retention remains a critical issue as healthcare workers prefer urban postings. Equipment maintenance is irregular due to funding constraints.",
@@ -175,152 +215,189 @@ SPECIAL_NOTES_BAD = [
     "This area represents a significant medical desert. The population-to-facility ratio far exceeds WHO recommendations.",
 ]
 
-def generate_capabilities_text(fac_data):
-    ftype = fac_data["type"]
-    region = fac_data["region"]
-    is_northern = region in NORTHERN_REGIONS
-    is_small = ftype in ("CHPS", "CPHS", "Clinic", "clinic", "RCH", "Health Centre", "Maternity Home")
-    
-    services = fac_data.get("services", [])
+def pick(rng, options):
+    return options[rng.integers(len(options))]
+
+
+def sample(rng, pool, k):
+    return [pool[j] for j in rng.choice(len(pool), size=k, replace=False)]
+
+
+def generate_capabilities_text(rng, name, ftype, region, district, town, ownership,
+                               beds, staff, services, equipment, is_northern, is_small):
     services_text = ", ".join(services[:5]) if services else "basic outpatient care"
-    equipment = fac_data.get("equipment", [])
     equip_text = f"Available equipment includes {', '.join(equipment[:4])}." if equipment else "Equipment is limited to basic supplies."
     
     if is_northern and is_small:
-        challenge_text = random.choice(CHALLENGES_NORTHERN)
-        special_text = random.choice(SPECIAL_NOTES_BAD)
+        challenge_text = pick(rng, CHALLENGES_NORTHERN)
+        special_text = pick(rng, SPECIAL_NOTES_BAD)
     elif is_northern:
-        challenge_text = random.choice(CHALLENGES_NORTHERN)
-        special_text = random.choice(SPECIAL_NOTES_GOOD) if random.random() > 0.5 else random.choice(SPECIAL_NOTES_BAD)
+        challenge_text = pick(rng, CHALLENGES_NORTHERN)
+        special_text = pick(rng, SPECIAL_NOTES_GOOD) if rng.random() > 0.5 else pick(rng, SPECIAL_NOTES_BAD)
     elif is_small:
-        challenge_text = random.choice(CHALLENGES_GENERAL)
+        challenge_text = pick(rng, CHALLENGES_GENERAL)
         special_text = ""
     else:
-        challenge_text = random.choice(CHALLENGES_GENERAL)
-        special_text = random.choice(SPECIAL_NOTES_GOOD)
-    
-    template = random.choice(CAPABILITY_TEMPLATES_SMALL if is_small else CAPABILITY_TEMPLATES_HOSPITAL)
+        challenge_text = pick(rng, CHALLENGES_GENERAL)
+        special_text = pick(rng, SPECIAL_NOTES_GOOD)
     
-    return template.format(
-        name=fac_data["name"],
-        type=ftype,
-        region=region,
-        district=fac_data["district"],
-        town=fac_data["town"],
-        ownership=fac_data["ownership"],
-        beds=fac_data["beds"],
-        staff=fac_data["staff_count"],
-        services_text=services_text,
-        equip_text=equip_text,
-        challenge_text=challenge_text,
-        special_text=special_text,
-    ).strip()
-
-
-def generate_notes(fac_data):
-    ftype = fac_data["type"]
-    region = fac_data["region"]
-    is_northern = region in NORTHERN_REGIONS
-    is_small = ftype in ("CHPS", "CPHS", "Clinic", "clinic", "RCH", "Health Centre")
+    template = pick(rng, CAPABILITY_TEMPLATES_SMALL_PARSED if is_small else CAPABILITY_TEMPLATES_HOSPITAL_PARSED)
     
+    return render_template(template, {
+        "name": name,
+        "type": ftype,
+        "region": region,
+        "district": district,
+        "town": town,
+        "ownership": ownership,
+        "beds": str(beds),
+        "staff": str(staff),
+        "services_text": services_text,
+        "equip_text": equip_text,
+        "challenge_text": challenge_text,
+        "special_text": special_text,
+    }).strip()
+
+
+def generate_notes(is_northern, ftype, ownership, beds):
+    """Build the notes column for all facilities at once from boolean masks."""
+    is_small = ftype.isin(SMALL_TYPES_NOTES).to_numpy()
+
+    tags = np.stack([
+        np.where(is_northern & (is_small | (beds < 50)), "MEDICAL DESERT", ""),
+        np.where(beds < 20, "Very limited capacity", ""),
+        np.where(ftype.isin(REFERRAL_TYPES).to_numpy(), "Key referral facility", ""),
+        np.where(ownership.isin(FAITH_OWNERSHIP).to_numpy(), "Faith-based management", ""),
+        np.where((ownership == "Private").to_numpy(), "Private sector facility", ""),
+    ], axis=1).astype(object)
+
     notes = []
-    if is_northern and is_small:
-        notes.append("MEDICAL DESERT")
-    elif is_northern and fac_data.get("beds", 0) < 50:
-        notes.append("MEDICAL DESERT")
-    
-    if fac_data.get("beds", 0) < 20:
-        notes.append("Very limited capacity")
-    if ftype in ("Teaching Hospital", "Regional Hospital"):
-        notes.append("Key referral facility")
-    if fac_data["ownership"] in ("CHAG", "Mission"):
-        notes.append("Faith-based management")
-    if fac_data["ownership"] == "Private":
-        notes.append("Private sector facility")
-    
-    return ". ".join(notes) + "." if notes else "Standard facility."
+    for row in tags:
+        parts = [t for t in row if t]
+        notes.append(". ".join(parts) + "." if parts else "Standard facility.")
+    return notes
 
 
-# Build enriched dataset
-enriched = []
-for i, row in enumerate(facilities_raw):
-    ftype = row["Type"]
-    if ftype in ("CPHS",):
-        ftype = "CHPS"
-    
-    # Deterministic random based on facility name
-    seed = int(hashlib.md5(row["FacilityName"].encode()).hexdigest()[:8], 16)
-    random.seed(seed)
-    
-    bed_range = BED_RANGES.get(ftype, (5, 50))
-    staff_range = STAFF_RANGES.get(ftype, (3, 30))
-    
-    equipment = EQUIPMENT_BY_TYPE.get(ftype, ["Basic First Aid"])
-    # Randomly select subset
-    n_equip = max(1, len(equipment) - random.randint(0, 3))
-    equipment = random.sample(equipment, min(n_equip, len(equipment)))
-    
-    specialties = SPECIALTIES_BY_TYPE.get(ftype, [])
-    if specialties:
-        n_spec = max(1, len(specialties) - random.randint(0, 2))
-        specialties = random.sample(specialties, min(n_spec, len(specialties)))
-    
-    services = SERVICES_BY_TYPE.get(ftype, ["Outpatient"])
-    n_serv = max(1, len(services) - random.randint(0, 2))
-    services = random.sample(services, min(n_serv, len(services)))
-    
-    beds = random.randint(*bed_range)
-    staff = random.randint(*staff_range)
-    
-    is_northern = row["Region"] in NORTHERN_REGIONS
-    is_small = ftype in ("CHPS", "Clinic", "clinic", "RCH", "Health Centre", "Maternity Home")
+def load_facilities():
+    """Load the Kaggle CSV and keep only actual healthcare facilities."""
+    kaggle_df = pd.read_csv(
+        DATA_DIR / "ghana_health_facilities_kaggle.csv",
+        usecols=["FacilityName", "Region", "District", "Town", "Type", "Ownership", "Latitude", "Longitude"],
+        # Low-cardinality columns are categorical, so each distinct value is
+        # a single shared string object rather than one copy per row
+        dtype={
+            "Type": "category", "Region": "category", "Ownership": "category", "District": "category",
+            "FacilityName": "string", "Town": "string",
+        },
+        keep_default_na=False,
+        na_values={"Latitude": [""], "Longitude": [""]},
+    )
+    df = kaggle_df[kaggle_df["Type"].isin(FACILITY_TYPES)].reset_index(drop=True)
+    df["Type"] = df["Type"].astype(str).replace("CPHS", "CHPS").astype("category")
+
+    print(f"Filtered to {len(df)} healthcare facilities from {len(kaggle_df)} total rows")
+    return df
+
+
+def build_record(item):
+    """Build one enriched facility dict."""
+    i, name, region, district, town, ftype, ownership, lat, lng, beds, staff, is_northern, is_small, status_bucket, notes, last_inspection, seed = item
+    row_rng = np.random.default_rng(np.random.SeedSequence(SEED, spawn_key=(int(seed),)))
+
+    # Randomly select subsets; max(1, size - k) never exceeds a non-empty pool
+    pool, size = EQUIPMENT_META.get(ftype, DEFAULT_EQUIPMENT)
+    equipment = sample(row_rng, pool, max(1, size - row_rng.integers(0, 3, endpoint=True)))
     
-    if is_northern and is_small:
-        status = random.choice(STATUS_OPTIONS_BAD)
-    elif is_northern:
-        status = random.choice(STATUS_OPTIONS_MID + STATUS_OPTIONS_BAD)
-    elif is_small:
-        status = random.choice(STATUS_OPTIONS_GOOD + STATUS_OPTIONS_MID)
+    pool, size = SPECIALTIES_META.get(ftype, DEFAULT_SPECIALTIES)
+    if size:
+        specialties = sample(row_rng, pool, max(1, size - row_rng.integers(0, 2, endpoint=True)))
     else:
-        status = random.choice(STATUS_OPTIONS_GOOD)
+        specialties = []
     
-    lat = float(row["Latitude"]) if row["Latitude"] else 7.5 + random.uniform(-2, 2)
-    lng = float(row["Longitude"]) if row["Longitude"] else -1.5 + random.uniform(-1.5, 1.5)
+    pool, size = SERVICES_META.get(ftype, DEFAULT_SERVICES)
+    services = sample(row_rng, pool, max(1, size - row_rng.integers(0, 2, endpoint=True)))
     
-    fac = {
+    status = pick(row_rng, STATUS_POOLS[status_bucket])
+    beds = int(beds)
+    staff = int(staff)
+    capabilities_text = generate_capabilities_text(
+        row_rng, name, ftype, region, district, town, ownership,
+        beds, staff, services, equipment, is_northern, is_small,
+    )
+    
+    return {
         "facility_id": f"GH-{i+1:04d}",
-        "name": row["FacilityName"],
-        "region": row["Region"],
-        "district": row["District"],
-        "town": row.get("Town", ""),
+        "name": name,
+        "region": region,
+        "district": district,
+        "town": town,
         "type": ftype,
-        "ownership": row["Ownership"],
-        "latitude": round(lat, 6),
-        "longitude": round(lng, 6),
+        "ownership": ownership,
+        "latitude": round(float(lat), 6),
+        "longitude": round(float(lng), 6),
         "beds": beds,
         "staff_count": staff,
         "specialties": specialties,
         "equipment": equipment,
         "services": services,
         "operational_status": status,
+        "capabilities_text": capabilities_text,
+        "notes": notes,
+        "last_inspection": last_inspection,
     }
-    
-    fac["capabilities_text"] = generate_capabilities_text(fac)
-    fac["notes"] = generate_notes(fac)
-    fac["last_inspection"] = f"202{random.randint(3,4)}-{random.randint(1,12):02d}-{random.randint(1,28):02d}"
-    
-    enriched.append(fac)
 
-# Write enriched dataset
-output_path = DATA_DIR / "ghana_facilities.json"
-with open(output_path, "w") as f:
-    json.dump(enriched, f, indent=2)
 
-print(f"Generated {len(enriched)} enriched facility records")
-print(f"Output: {output_path}")
+def main():
+    rng = np.random.default_rng(SEED)
+    df = load_facilities()
+
+    # Draw the numeric columns in one shot per column, indexed by facility type
+    n = len(df)
+    type_codes = df["Type"].cat.codes.to_numpy()
+    type_names = df["Type"].cat.categories
+    bed_bounds = np.array([BED_RANGES.get(t, (5, 50)) for t in type_names])
+    staff_bounds = np.array([STAFF_RANGES.get(t, (3, 30)) for t in type_names])
+    beds_arr = rng.integers(bed_bounds[type_codes, 0], bed_bounds[type_codes, 1], endpoint=True)
+    staff_arr = rng.integers(staff_bounds[type_codes, 0], staff_bounds[type_codes, 1], endpoint=True)
+
+    lat_arr = pd.to_numeric(df["Latitude"], errors="coerce").to_numpy(dtype=float)
+    lng_arr = pd.to_numeric(df["Longitude"], errors="coerce").to_numpy(dtype=float)
+    # Missing coordinates are filled here; build_record() rounds with builtin
+    # round(), since np.round can shift the last digit of the real Kaggle values
+    lat_arr = np.where(np.isnan(lat_arr), 7.5 + rng.uniform(-2, 2, size=n), lat_arr)
+    lng_arr = np.where(np.isnan(lng_arr), -1.5 + rng.uniform(-1.5, 1.5, size=n), lng_arr)
+
+    # Region/type flags shared by the status, notes and capability text rules
+    is_northern = df["Region"].isin(NORTHERN_REGIONS).to_numpy()
+    is_small_cap = df["Type"].isin(SMALL_TYPES_CAP).to_numpy()
+    status_buckets = 2 * is_northern.astype(int) + df["Type"].isin(SMALL_TYPES_STATUS).to_numpy(dtype=int)
+    notes = generate_notes(is_northern, df["Type"], df["Ownership"], beds_arr)
+
+    last_inspections = INSPECTION_DATES[rng.integers(len(INSPECTION_DATES), size=n)]
+
+    # Deterministic per-facility stream keys, from a hash of the name
+    row_seeds = pd.util.hash_pandas_object(df["FacilityName"], index=False).to_numpy(np.uint64)
+
+    # Build enriched dataset
+    items = zip(
+        range(n), df["FacilityName"], df["Region"], df["District"], df["Town"], df["Type"], df["Ownership"],
+        lat_arr, lng_arr, beds_arr, staff_arr, is_northern, is_small_cap, status_buckets, notes, last_inspections, row_seeds,
+    )
+    enriched = list(map(build_record, items))
+
+    # Write enriched dataset
+    output_path = DATA_DIR / "ghana_facilities.json"
+    output_path.write_bytes(orjson.dumps(enriched, option=orjson.OPT_INDENT_2))
+
+    print(f"Generated {len(enriched)} enriched facility records")
+    print(f"Output: {output_path}")
+
+    # Stats, from the columns rather than further passes over the records
+    desert_count = sum("MEDICAL DESERT" in note for note in notes)
+    print(f"Medical deserts flagged: {desert_count}")
+    print(f"Regions: {df['Region'].nunique()}")
+    print(f"Types: {df['Type'].nunique()}")
+
 
-# Stats
-desert_count = sum(1 for f in enriched if "MEDICAL DESERT" in f.get("notes", ""))
-print(f"Medical deserts flagged: {desert_count}")
-print(f"Regions: {len(set(f['region'] for f in enriched))}")
-print(f"Types: {len(set(f['type'] for f in enriched))}")
+if __name__ == "__main__":
+    main()
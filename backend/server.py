@@ -1,9 +1,17 @@
 import os
-import json
 import uuid
 import asyncio
 import time
 import re
+import gzip
+import hashlib
+import contextlib
+import threading
+import functools
+import operator
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 from pathlib import Path
@@ -13,17 +21,30 @@ load_dotenv()
 
 from fastapi import FastAPI, HTTPException, Request, Response, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-import motor.motor_asyncio
+from pymongo import AsyncMongoClient
 import httpx
 import numpy as np
+import pandas as pd
+import orjson
 
 # FAISS + sentence-transformers
 import faiss
+import torch
 from sentence_transformers import SentenceTransformer
 
+# Optional: Intel Extension for PyTorch, for BF16 embedding inference on Xeon (AMX/VNNI)
+try:
+    import intel_extension_for_pytorch as ipex
+except ImportError:
+    ipex = None
+
 # MLFlow experiment tracking
 import mlflow
+from mlflow.entities import Metric, Param
+from mlflow.tracking import MlflowClient
 
 # Emergent LLM integration
 from emergentintegrations.llm.chat import LlmChat, UserMessage
@@ -32,7 +53,11 @@ MONGO_URL = os.environ.get("MONGO_URL")
 DB_NAME = os.environ.get("DB_NAME")
 EMERGENT_LLM_KEY = os.environ.get("EMERGENT_LLM_KEY")
 
-app = FastAPI(title="Virtue Foundation IDP - Medical Desert Tracker")
+
+app = FastAPI(
+    title="Virtue Foundation IDP - Medical Desert Tracker",
+    default_response_class=ORJSONResponse,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -41,16 +66,60 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
-client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
+client = AsyncMongoClient(MONGO_URL)
 db = client[DB_NAME]
 
 # ── Globals ──
 faiss_index = None
-facility_texts = []
-facility_ids = []
+# Object arrays so search hits can be fancy-indexed in one step
+facility_texts = np.array([], dtype=object)
+facility_ids = np.array([], dtype=object)
+facility_summary = ""
+# Planning prompt context per region, built from the facility list at ingest
+region_summaries = {}
+# Unfiltered /api/facilities payload, serialized (and gzipped) once at startup
+facilities_json = b""
+facilities_json_gz = b""
+# Same, per lowercased region name, as (json, gzipped json)
+facilities_json_by_region = {}
+# /api/health body, serialized once the index is built (load balancers probe it constantly)
+health_json = b""
 embed_model = None
+EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
 EMBED_DIM = 384
+EMBED_BF16 = ipex is not None and os.environ.get("EMBED_BF16", "1") == "1"
+EMBED_BATCH_SIZE = 64
+EMBED_COMPILE = torch.cuda.is_available() and os.environ.get("EMBED_COMPILE", "1") == "1"
+
+# ── FAISS index tuning ──
+# Exact search below FAISS_IVF_MIN_DOCS, IVF above it, IVF+PQ compression
+# above FAISS_PQ_MIN_DOCS. nprobe trades recall for speed on IVF indexes.
+FAISS_IVF_MIN_DOCS = 10_000
+FAISS_PQ_MIN_DOCS = 50_000
+FAISS_NPROBE = int(os.environ.get("FAISS_NPROBE", "8"))
+# GPU resources must outlive the GPU index, so they are held module-wide
+FAISS_USE_GPU = hasattr(faiss, "StandardGpuResources") and faiss.get_num_gpus() > 0
+faiss_gpu_res = None
+
+# ── Query embedding cache ──
+# LRU of query embeddings keyed by a hash of the normalized query text.
+# The MiniLM tokenizer is uncased, so lowercasing does not change the vector.
+QUERY_CACHE_SIZE = 4096
+query_embedding_cache = OrderedDict()
+
+# ── Chat session memory ──
+# Last SESSION_MEMORY_TURNS turns per session, read from Mongo only the first
+# time a session is seen by this process. LRU-capped by session count.
+SESSION_MEMORY_TURNS = 5
+SESSION_MEMORY_MAX_SESSIONS = 10_000
+session_memory = OrderedDict()
+
+# ── Query batching ──
+# Concurrent searches arriving within this window share one index.search call
+SEARCH_BATCH_WINDOW_S = 0.008
+search_queue = None
 
 # ── Data path ──
 DATA_DIR = Path(__file__).parent / "data"
@@ -59,7 +128,15 @@ DATA_DIR = Path(__file__).parent / "data"
 MLFLOW_TRACKING_DIR = Path(__file__).parent / "mlruns"
 MLFLOW_TRACKING_DIR.mkdir(exist_ok=True)
 mlflow.set_tracking_uri(f"file://{MLFLOW_TRACKING_DIR}")
-mlflow.set_experiment("VirtueFoundation_IDP_Agent")
+mlflow_experiment_id = mlflow.set_experiment("VirtueFoundation_IDP_Agent").experiment_id
+mlflow_client = MlflowClient()
+# One writer thread keeps tracking I/O off the request path without competing
+# for threads with it. Each request submits a single write job at its end; past
+# MLFLOW_MAX_PENDING_WRITES queued jobs new ones are dropped (tracking is
+# best-effort) rather than queued without bound.
+MLFLOW_MAX_PENDING_WRITES = 256
+mlflow_exec = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mlflow")
+mlflow_write_slots = threading.BoundedSemaphore(MLFLOW_MAX_PENDING_WRITES)
 
 # ── Pydantic Models ──
 class ChatRequest(BaseModel):
@@ -96,114 +173,274 @@ class Text2SQLResponse(BaseModel):
 def get_embed_model():
     global embed_model
     if embed_model is None:
-        print("Loading sentence-transformers model (all-MiniLM-L6-v2)...")
-        embed_model = SentenceTransformer("all-MiniLM-L6-v2")
+        print(f"Loading sentence-transformers model ({EMBED_MODEL_NAME})...")
+        embed_model = SentenceTransformer(EMBED_MODEL_NAME)
+        if EMBED_BF16:
+            embed_model[0].auto_model = ipex.optimize(embed_model[0].auto_model.eval(), dtype=torch.bfloat16)
+            print("Sentence-transformers model optimized with IPEX (bfloat16).")
+        if EMBED_COMPILE:
+            # Sentence-transformers pads to the longest text in each batch, so
+            # shapes vary; dynamic=True keeps that from recompiling per length.
+            embed_model[0].auto_model = torch.compile(embed_model[0].auto_model, mode="max-autotune", dynamic=True)
+            embed_model.encode(["warm-up"], normalize_embeddings=True)
+            print("Sentence-transformers model compiled with torch.compile.")
         print("Sentence-transformers model loaded.")
     return embed_model
 
 
+def embed_autocast():
+    """BF16 autocast for encoder forward passes when IPEX is enabled."""
+    if EMBED_BF16:
+        return torch.autocast("cpu", dtype=torch.bfloat16)
+    return contextlib.nullcontext()
+
+
 def encode_texts(texts: list) -> np.ndarray:
     model = get_embed_model()
-    embeddings = model.encode(texts, show_progress_bar=False, normalize_embeddings=True)
+    if torch.cuda.device_count() > 1:
+        # One worker process per GPU, each encoding a slice of the corpus
+        pool = model.start_multi_process_pool()
+        try:
+            embeddings = model.encode(
+                texts, pool=pool, batch_size=EMBED_BATCH_SIZE,
+                show_progress_bar=False, normalize_embeddings=True,
+            )
+        finally:
+            model.stop_multi_process_pool(pool)
+    else:
+        with embed_autocast():
+            embeddings = model.encode(
+                texts, batch_size=EMBED_BATCH_SIZE, convert_to_numpy=True,
+                show_progress_bar=False, normalize_embeddings=True,
+            )
     return np.array(embeddings, dtype=np.float32)
 
 
 def encode_query(text: str) -> np.ndarray:
+    key = hashlib.blake2b(" ".join(text.lower().split()).encode(), digest_size=16).digest()
+    cached = query_embedding_cache.get(key)
+    if cached is not None:
+        query_embedding_cache.move_to_end(key)
+        return cached
+
     model = get_embed_model()
-    embedding = model.encode([text], normalize_embeddings=True)
-    return np.array(embedding, dtype=np.float32)
+    with embed_autocast():
+        embedding = np.array(model.encode([text], normalize_embeddings=True), dtype=np.float32)
+    query_embedding_cache[key] = embedding
+    if len(query_embedding_cache) > QUERY_CACHE_SIZE:
+        query_embedding_cache.popitem(last=False)
+    return embedding
+
+
+def make_faiss_index(embeddings: np.ndarray):
+    """Pick a FAISS index for the corpus size; all variants use inner product."""
+    n, dim = embeddings.shape
+    if n < FAISS_IVF_MIN_DOCS:
+        index = faiss.IndexFlatIP(dim)
+    else:
+        nlist = int(4 * np.sqrt(n))
+        coarse = f"IVF{nlist},PQ{dim // 8}x8" if n > FAISS_PQ_MIN_DOCS else f"IVF{nlist},Flat"
+        index = faiss.index_factory(dim, coarse, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+        index.nprobe = FAISS_NPROBE
+    index.add(embeddings)
+    if FAISS_USE_GPU:
+        index = faiss_index_to_gpu(index)
+    return index
+
+
+def faiss_index_to_gpu(index):
+    """Clone a CPU index onto GPU 0, storing vectors as float16."""
+    global faiss_gpu_res
+    if faiss_gpu_res is None:
+        faiss_gpu_res = faiss.StandardGpuResources()
+    co = faiss.GpuClonerOptions()
+    co.useFloat16 = True
+    return faiss.index_cpu_to_gpu(faiss_gpu_res, 0, index, co)
+
+
+# Fixed layout of the text chunk embedded for each facility
+FACILITY_TEXT_TEMPLATE = (
+    "Facility: %s (ID: %s)\n"
+    "Region: %s, District: %s\n"
+    "Type: %s\n"
+    "Beds: %s, Staff: %s\n"
+    "Specialties: %s\n"
+    "Equipment: %s\n"
+    "Services: %s\n"
+    "Status: %s\n"
+    "Capabilities: %s\n"
+    "Notes: %s"
+)
+facility_text_head = operator.itemgetter("name", "facility_id", "region", "district", "type", "beds", "staff_count")
+facility_text_tail = operator.itemgetter("operational_status", "capabilities_text", "notes")
+
+
+def facility_text(fac: dict) -> str:
+    return FACILITY_TEXT_TEMPLATE % (
+        *facility_text_head(fac),
+        ", ".join(fac["specialties"]) or "None",
+        ", ".join(fac["equipment"]) or "None",
+        ", ".join(fac["services"]) or "None",
+        *facility_text_tail(fac),
+    )
 
 
 async def build_faiss_index():
     """Build FAISS index from facility data using sentence-transformers."""
-    global faiss_index, facility_texts, facility_ids, EMBED_DIM
+    global faiss_index, facility_texts, facility_ids, facility_summary, region_summaries, health_json, EMBED_DIM
 
     facilities_path = DATA_DIR / "ghana_facilities.json"
-    with open(facilities_path) as f:
-        facilities = json.load(f)
+    facilities = orjson.loads(facilities_path.read_bytes())
 
-    # Store in MongoDB
-    existing = await db.facilities.count_documents({})
+    # Store in MongoDB (collection metadata count, no scan)
+    existing = await db.facilities.estimated_document_count()
     if existing == 0:
         await db.facilities.insert_many(facilities)
 
     # Build text chunks
-    texts = []
-    ids = []
-    for fac in facilities:
-        text = (
-            f"Facility: {fac['name']} (ID: {fac['facility_id']})\n"
-            f"Region: {fac['region']}, District: {fac['district']}\n"
-            f"Type: {fac['type']}\n"
-            f"Beds: {fac['beds']}, Staff: {fac['staff_count']}\n"
-            f"Specialties: {', '.join(fac['specialties']) if fac['specialties'] else 'None'}\n"
-            f"Equipment: {', '.join(fac['equipment']) if fac['equipment'] else 'None'}\n"
-            f"Services: {', '.join(fac['services']) if fac['services'] else 'None'}\n"
-            f"Status: {fac['operational_status']}\n"
-            f"Capabilities: {fac['capabilities_text']}\n"
-            f"Notes: {fac['notes']}"
-        )
-        texts.append(text)
-        ids.append(fac["facility_id"])
-
-    # Encode with sentence-transformers (batched)
-    print(f"Encoding {len(texts)} facility documents with sentence-transformers...")
-    t0 = time.time()
-    embeddings_array = encode_texts(texts)
-    elapsed = time.time() - t0
-    print(f"Encoding complete in {elapsed:.1f}s. Shape: {embeddings_array.shape}")
+    texts = [facility_text(fac) for fac in facilities]
+    ids = [fac["facility_id"] for fac in facilities]
+
+    # Encode with sentence-transformers (batched), reusing the on-disk cache
+    # when the exact same documents were encoded by the same model before
+    digest = hashlib.blake2b(f"{EMBED_MODEL_NAME}|bf16={EMBED_BF16}".encode(), digest_size=16)
+    for text in texts:
+        digest.update(text.encode())
+        digest.update(b"\0")
+    cache_path = DATA_DIR / f"emb_{digest.hexdigest()}.npy"
+    if cache_path.exists():
+        embeddings_array = np.load(cache_path)
+        print(f"Loaded cached embeddings from {cache_path.name}. Shape: {embeddings_array.shape}")
+    else:
+        print(f"Encoding {len(texts)} facility documents with sentence-transformers...")
+        t0 = time.time()
+        embeddings_array = encode_texts(texts)
+        elapsed = time.time() - t0
+        print(f"Encoding complete in {elapsed:.1f}s. Shape: {embeddings_array.shape}")
+        np.save(cache_path, embeddings_array)
 
     EMBED_DIM = embeddings_array.shape[1]
-    faiss_index = faiss.IndexFlatIP(EMBED_DIM)
-    faiss_index.add(embeddings_array)
+    faiss_index = make_faiss_index(embeddings_array)
 
-    facility_texts = texts
-    facility_ids = ids
+    facility_texts = np.array(texts, dtype=object)
+    facility_ids = np.array(ids, dtype=object)
+    facility_summary = f"Total: {len(ids)} facilities across {len({fac['region'] for fac in facilities})} regions."
+    region_summaries = summarize_regions(facilities)
+    plan_system_message.cache_clear()
+    health_json = build_health_payload()
 
     print(f"FAISS index built with {len(texts)} docs, dim={EMBED_DIM}")
 
 
+async def search_batcher():
+    """Drain queued query vectors and answer them with batched FAISS searches."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await search_queue.get()]
+        deadline = loop.time() + SEARCH_BATCH_WINDOW_S
+        while (timeout := deadline - loop.time()) > 0:
+            try:
+                batch.append(await asyncio.wait_for(search_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        queries = np.vstack([vec for vec, _, _ in batch])
+        k = max(top_k for _, top_k, _ in batch)
+        try:
+            scores, indices = await loop.run_in_executor(None, faiss_index.search, queries, k)
+        except Exception as e:
+            for _, _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            continue
+
+        for row, (_, top_k, fut) in enumerate(batch):
+            if not fut.done():
+                fut.set_result((scores[row:row + 1, :top_k], indices[row:row + 1, :top_k]))
+
+
 async def search_similar(query: str, top_k: int = 5) -> list:
     if faiss_index is None:
         return []
 
     query_vec = encode_query(query)
-    scores, indices = faiss_index.search(query_vec, top_k)
+    if search_queue is None:
+        scores, indices = faiss_index.search(query_vec, top_k)
+    else:
+        fut = asyncio.get_running_loop().create_future()
+        await search_queue.put((query_vec, top_k, fut))
+        scores, indices = await fut
 
-    results = []
-    for i, idx in enumerate(indices[0]):
-        if 0 <= idx < len(facility_texts) and scores[0][i] > 0:
-            results.append({
-                "facility_id": facility_ids[idx],
-                "text": facility_texts[idx],
-                "score": float(scores[0][i]),
-            })
-    return results
+    idx, sc = indices[0], scores[0]
+    mask = (idx >= 0) & (idx < len(facility_texts)) & (sc > 0)
+    idx, sc = idx[mask], sc[mask]
+    return [
+        {"facility_id": fid, "text": text, "score": score}
+        for fid, text, score in zip(facility_ids[idx].tolist(), facility_texts[idx].tolist(), sc.tolist())
+    ]
 
 
 # ══════════════════════════════════════════════
 # 2. MLFLOW EXPERIMENT TRACKING
 # ══════════════════════════════════════════════
 
-def start_mlflow_run(run_name: str, tags: dict = None):
-    """Start an MLFlow run for tracking agent reasoning."""
-    run = mlflow.start_run(run_name=run_name, tags=tags or {})
-    return run
+def mlflow_call(fn, *args, **kwargs):
+    """Run an MLFlow call on the worker thread. MLFlow is best-effort."""
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        return None
 
 
-def log_agent_step(step_num: int, action: str, detail: str, data_used: str, latency_ms: float = 0):
-    """Log a single agent reasoning step to MLFlow."""
-    mlflow.log_params({
-        f"step_{step_num}_action": action[:250],
-    })
-    mlflow.log_metrics({
-        f"step_{step_num}_latency_ms": latency_ms,
-    })
-    # Log as artifact text
-    step_text = f"Step {step_num}: {action}\nDetail: {detail}\nData: {data_used}\nLatency: {latency_ms:.0f}ms"
-    step_path = MLFLOW_TRACKING_DIR / f"step_{step_num}.txt"
-    step_path.write_text(step_text)
-    mlflow.log_artifact(str(step_path))
+def write_mlflow_run(run_id: str, params: dict, metrics: dict, texts: dict, end: bool, timestamp: int):
+    mlflow_client.log_batch(
+        run_id,
+        metrics=[Metric(k, float(v), timestamp, 0) for k, v in metrics.items()],
+        params=[Param(k, str(v)) for k, v in params.items()],
+    )
+    for name, text in texts.items():
+        mlflow_client.log_text(run_id, text, name)
+    if end:
+        mlflow_client.set_terminated(run_id)
+
+
+@dataclass(slots=True)
+class MlflowRecord:
+    """Params, metrics and step texts collected during one request."""
+    params: dict = field(default_factory=dict)
+    metrics: dict = field(default_factory=dict)
+    texts: dict = field(default_factory=dict)
+
+
+async def start_mlflow_run(run_name: str, tags: dict = None) -> Optional[str]:
+    """Start an MLFlow run for tracking agent reasoning and return its id."""
+    # Awaited because the chat response returns the run id. Runs off the writer
+    # queue so it never waits behind other requests' writes. Concurrent calls are
+    # safe: the file store puts each run in a new uuid-named directory and only
+    # reads the experiment's meta.yaml.
+    run = await asyncio.to_thread(
+        mlflow_call, mlflow_client.create_run, mlflow_experiment_id, tags=tags or {}, run_name=run_name,
+    )
+    return run.info.run_id if run else None
+
+
+def finish_mlflow_run(run_id: Optional[str], record: MlflowRecord):
+    """Queue one write of everything the request recorded, ending the run."""
+    if not run_id or not mlflow_write_slots.acquire(blocking=False):
+        return
+    future = mlflow_exec.submit(
+        mlflow_call, write_mlflow_run, run_id,
+        record.params, record.metrics, record.texts, True, int(time.time() * 1000),
+    )
+    future.add_done_callback(lambda _: mlflow_write_slots.release())
+
+
+def log_agent_step(record: MlflowRecord, step_num: int, action: str, detail: str, data_used: str, latency_ms: float = 0):
+    """Record a single agent reasoning step for MLFlow."""
+    record.params[f"step_{step_num}_action"] = action[:250]
+    record.metrics[f"step_{step_num}_latency_ms"] = latency_ms
+    record.texts[f"step_{step_num}.txt"] = f"Step {step_num}: {action}\nDetail: {detail}\nData: {data_used}\nLatency: {latency_ms:.0f}ms"
 
 
 # ══════════════════════════════════════════════
@@ -272,7 +509,7 @@ Return ONLY the JSON, no markdown or extra text."""
             response_text = response_text[4:]
     response_text = response_text.strip()
 
-    return json.loads(response_text)
+    return orjson.loads(response_text)
 
 
 # ══════════════════════════════════════════════
@@ -387,20 +624,73 @@ async def logout(request: Request, response: Response):
 # FACILITY ENDPOINTS
 # ══════════════════════════════════════════════
 
+# Lowercased shadow copies of the closed-vocabulary filter fields, so
+# case-insensitive filters are exact (indexable) matches instead of regexes.
+# They are internal and excluded from every facility response.
+FACILITY_LC_FIELDS = {"region_lc": 0, "type_lc": 0, "specialties_lc": 0}
+FACILITY_PROJECTION = {"_id": 0, **FACILITY_LC_FIELDS}
+
+
+async def add_lowercase_fields():
+    """Backfill the *_lc shadow fields on facilities that do not have them yet."""
+    await db.facilities.update_many(
+        {"region_lc": {"$exists": False}},
+        [{"$set": {
+            "region_lc": {"$toLower": "$region"},
+            "type_lc": {"$toLower": "$type"},
+            "specialties_lc": {"$map": {"input": {"$ifNull": ["$specialties", []]}, "in": {"$toLower": "$$this"}}},
+        }}],
+    )
+
+
+async def cache_facilities_payload():
+    """Serialize the full and per-region facility lists once so those requests skip Mongo and JSON encoding."""
+    global facilities_json, facilities_json_gz, facilities_json_by_region
+    docs = await db.facilities.find({}, FACILITY_PROJECTION).to_list(None)
+    facilities_json = orjson.dumps(docs)
+    facilities_json_gz = gzip.compress(facilities_json)
+
+    by_region = {}
+    for doc in docs:
+        by_region.setdefault(doc["region"].lower(), []).append(doc)
+    facilities_json_by_region = {}
+    for region, region_docs in by_region.items():
+        body = orjson.dumps(region_docs)
+        facilities_json_by_region[region] = (body, gzip.compress(body))
+
+
+def json_bytes_response(request: Request, body: bytes, body_gz: bytes) -> Response:
+    """Pre-serialized JSON, sent pre-gzipped when the client accepts it."""
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        return Response(
+            content=body_gz, media_type="application/json",
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+        )
+    return Response(content=body, media_type="application/json")
+
+
 @app.get("/api/facilities")
 async def get_facilities(
+    request: Request,
     region: Optional[str] = None,
     type: Optional[str] = None,
     specialty: Optional[str] = None,
     search: Optional[str] = None,
 ):
+    if facilities_json and not (type or specialty or search):
+        if not region:
+            return json_bytes_response(request, facilities_json, facilities_json_gz)
+        cached = facilities_json_by_region.get(region.lower())
+        if cached:
+            return json_bytes_response(request, *cached)
+
     query = {}
     if region:
-        query["region"] = {"$regex": region, "$options": "i"}
+        query["region_lc"] = region.lower()
     if type:
-        query["type"] = {"$regex": type, "$options": "i"}
+        query["type_lc"] = type.lower()
     if specialty:
-        query["specialties"] = {"$regex": specialty, "$options": "i"}
+        query["specialties_lc"] = specialty.lower()
     if search:
         query["$or"] = [
             {"name": {"$regex": search, "$options": "i"}},
@@ -408,13 +698,13 @@ async def get_facilities(
             {"notes": {"$regex": search, "$options": "i"}},
         ]
 
-    facilities = await db.facilities.find(query, {"_id": 0}).to_list(5000)
+    facilities = await db.facilities.find(query, FACILITY_PROJECTION).to_list(5000)
     return facilities
 
 
 @app.get("/api/facilities/{facility_id}")
 async def get_facility(facility_id: str):
-    facility = await db.facilities.find_one({"facility_id": facility_id}, {"_id": 0})
+    facility = await db.facilities.find_one({"facility_id": facility_id}, FACILITY_PROJECTION)
     if not facility:
         raise HTTPException(status_code=404, detail="Facility not found")
     return facility
@@ -424,112 +714,174 @@ async def get_facility(facility_id: str):
 # ANALYSIS ENDPOINTS
 # ══════════════════════════════════════════════
 
-@app.get("/api/analysis/medical-deserts")
-async def get_medical_deserts():
-    facilities = await db.facilities.find({}, {"_id": 0}).to_list(5000)
-
-    regions = {}
-    for fac in facilities:
-        region = fac["region"]
-        if region not in regions:
-            regions[region] = {
-                "region": region, "facilities": [], "total_beds": 0,
-                "total_staff": 0, "specialties": set(),
-                "has_surgery": False, "has_icu": False,
-                "has_ct_mri": False, "has_blood_bank": False, "desert_score": 0,
-            }
-        r = regions[region]
-        r["facilities"].append(fac["name"])
-        r["total_beds"] += fac.get("beds", 0)
-        r["total_staff"] += fac.get("staff_count", 0)
-        for s in fac.get("specialties", []):
-            r["specialties"].add(s)
-        if "Surgery" in fac.get("services", []):
-            r["has_surgery"] = True
-        if "ICU" in fac.get("services", []):
-            r["has_icu"] = True
-        if any(e in fac.get("equipment", []) for e in ["CT Scanner", "MRI"]):
-            r["has_ct_mri"] = True
-        if "Blood Bank" in fac.get("services", []):
-            r["has_blood_bank"] = True
+# One collection scan serves the region rollups, totals and type counts used
+# by the desert analysis and the stats endpoint.
+FACILITY_ROLLUP_PIPELINE = [{"$facet": {
+    "by_region": [
+        {"$group": {
+            "_id": "$region",
+            "facilities": {"$push": "$name"},
+            "total_beds": {"$sum": "$beds"},
+            "total_staff": {"$sum": "$staff_count"},
+            "specialties": {"$push": {"$ifNull": ["$specialties", []]}},
+            "has_surgery": {"$max": {"$in": ["Surgery", {"$ifNull": ["$services", []]}]}},
+            "has_icu": {"$max": {"$in": ["ICU", {"$ifNull": ["$services", []]}]}},
+            "has_ct_mri": {"$max": {"$gt": [
+                {"$size": {"$setIntersection": [{"$ifNull": ["$equipment", []]}, ["CT Scanner", "MRI"]]}}, 0,
+            ]}},
+            "has_blood_bank": {"$max": {"$in": ["Blood Bank", {"$ifNull": ["$services", []]}]}},
+        }},
+        {"$addFields": {"specialties": {"$reduce": {
+            "input": "$specialties", "initialValue": [], "in": {"$setUnion": ["$$value", "$$this"]},
+        }}}},
+        {"$sort": {"_id": 1}},
+    ],
+    "totals": [{"$group": {
+        "_id": None,
+        "total_facilities": {"$sum": 1},
+        "total_beds": {"$sum": "$beds"},
+        "total_staff": {"$sum": "$staff_count"},
+        "medical_deserts": {"$sum": {"$cond": [
+            {"$regexMatch": {"input": {"$ifNull": ["$notes", ""]}, "regex": "MEDICAL DESERT"}}, 1, 0,
+        ]}},
+    }}],
+    "by_type": [{"$group": {"_id": "$type", "count": {"$sum": 1}}}],
+}}]
+
+# Serialized desert/stats responses. Facilities only change during startup
+# ingest, so these are rebuilt there instead of expiring on a timer.
+analysis_views = {}
+
+
+def score_regions(beds, staff, surgery, icu, ct_mri, blood_bank, n_specialties) -> np.ndarray:
+    """Desert score per region, computed branch-free over per-region arrays."""
+    return (
+        30 * (beds < 100) + 15 * ((beds >= 100) & (beds < 200))
+        + 20 * (staff < 200) + 10 * ((staff >= 200) & (staff < 500))
+        + 20 * ~surgery + 15 * ~icu + 10 * ~ct_mri + 5 * ~blood_bank
+        + 10 * (n_specialties < 3)
+    )
+
+
+def build_medical_deserts(rollups: dict) -> list:
+    regions = rollups["by_region"]
+    scores = score_regions(
+        np.array([r["total_beds"] for r in regions]),
+        np.array([r["total_staff"] for r in regions]),
+        np.array([r["has_surgery"] for r in regions], dtype=bool),
+        np.array([r["has_icu"] for r in regions], dtype=bool),
+        np.array([r["has_ct_mri"] for r in regions], dtype=bool),
+        np.array([r["has_blood_bank"] for r in regions], dtype=bool),
+        np.array([len(r["specialties"]) for r in regions]),
+    ).tolist()
 
     deserts = []
-    for region, data in regions.items():
-        score = 0
-        if data["total_beds"] < 100: score += 30
-        elif data["total_beds"] < 200: score += 15
-        if data["total_staff"] < 200: score += 20
-        elif data["total_staff"] < 500: score += 10
-        if not data["has_surgery"]: score += 20
-        if not data["has_icu"]: score += 15
-        if not data["has_ct_mri"]: score += 10
-        if not data["has_blood_bank"]: score += 5
-        if len(data["specialties"]) < 3: score += 10
-
-        data["desert_score"] = min(score, 100)
-        data["specialties"] = list(data["specialties"])
-        data["is_desert"] = score >= 40
-        data["severity"] = "Critical" if score >= 60 else "Moderate" if score >= 40 else "Adequate"
-        deserts.append(data)
+    for r, score in zip(regions, scores):
+        deserts.append({
+            "region": r["_id"],
+            "facilities": r["facilities"],
+            "total_beds": r["total_beds"],
+            "total_staff": r["total_staff"],
+            "specialties": r["specialties"],
+            "has_surgery": r["has_surgery"],
+            "has_icu": r["has_icu"],
+            "has_ct_mri": r["has_ct_mri"],
+            "has_blood_bank": r["has_blood_bank"],
+            "desert_score": min(score, 100),
+            "is_desert": score >= 40,
+            "severity": "Critical" if score >= 60 else "Moderate" if score >= 40 else "Adequate",
+        })
 
     deserts.sort(key=lambda x: x["desert_score"], reverse=True)
     return deserts
 
 
-@app.get("/api/analysis/stats")
-async def get_stats():
-    facilities = await db.facilities.find({}, {"_id": 0}).to_list(5000)
-
-    total_beds = sum(f.get("beds", 0) for f in facilities)
-    total_staff = sum(f.get("staff_count", 0) for f in facilities)
-    all_regions = set(f["region"] for f in facilities)
+def build_stats(rollups: dict) -> dict:
+    totals = rollups["totals"][0] if rollups["totals"] else {}
+    type_counts = {t["_id"]: t["count"] for t in rollups["by_type"]}
     all_specialties = set()
-    for f in facilities:
-        for s in f.get("specialties", []):
-            all_specialties.add(s)
-
-    desert_count = sum(1 for f in facilities if "MEDICAL DESERT" in f.get("notes", ""))
+    for r in rollups["by_region"]:
+        all_specialties.update(r["specialties"])
 
     return {
-        "total_facilities": len(facilities),
-        "total_beds": total_beds,
-        "total_staff": total_staff,
-        "total_regions": len(all_regions),
+        "total_facilities": totals.get("total_facilities", 0),
+        "total_beds": totals.get("total_beds", 0),
+        "total_staff": totals.get("total_staff", 0),
+        "total_regions": len(rollups["by_region"]),
         "total_specialties": len(all_specialties),
-        "medical_deserts": desert_count,
+        "medical_deserts": totals.get("medical_deserts", 0),
         "facility_types": {
-            "Teaching Hospital": sum(1 for f in facilities if f["type"] == "Teaching Hospital"),
-            "Regional Hospital": sum(1 for f in facilities if f["type"] == "Regional Hospital"),
-            "District Hospital": sum(1 for f in facilities if f["type"] == "District Hospital"),
-            "Health Centre": sum(1 for f in facilities if f["type"] == "Health Centre"),
+            t: type_counts.get(t, 0)
+            for t in ("Teaching Hospital", "Regional Hospital", "District Hospital", "Health Centre")
         },
     }
 
 
+async def refresh_analysis_views():
+    """Run the facility rollup once and store the serialized analysis responses."""
+    result = await (await db.facilities.aggregate(FACILITY_ROLLUP_PIPELINE)).to_list(1)
+    deserts = orjson.dumps(build_medical_deserts(result[0]))
+    stats = orjson.dumps(build_stats(result[0]))
+    analysis_views["medical_deserts"] = deserts
+    analysis_views["stats"] = stats
+    analysis_views["dashboard"] = b'{"stats":' + stats + b',"medical_deserts":' + deserts + b"}"
+
+
+async def get_analysis_view(name: str) -> Response:
+    if name not in analysis_views:
+        await refresh_analysis_views()
+    return Response(content=analysis_views[name], media_type="application/json")
+
+
+@app.get("/api/analysis/medical-deserts")
+async def get_medical_deserts():
+    return await get_analysis_view("medical_deserts")
+
+
+@app.get("/api/analysis/stats")
+async def get_stats():
+    return await get_analysis_view("stats")
+
+
+@app.get("/api/analysis/dashboard")
+async def get_dashboard():
+    """Stats and medical deserts in one response, from the same rollup snapshot."""
+    return await get_analysis_view("dashboard")
+
+
 # ══════════════════════════════════════════════
 # 4. RAG CHAT WITH MULTI-TURN MEMORY + MLFLOW
 # ══════════════════════════════════════════════
 
+async def get_session_memory(session_id: str) -> deque:
+    """Recent turns for a session, hydrated from chat_history on first use."""
+    turns = session_memory.get(session_id)
+    if turns is not None:
+        session_memory.move_to_end(session_id)
+    else:
+        docs = await db.chat_history.find(
+            {"session_id": session_id}, {"_id": 0, "message": 1, "response": 1}
+        ).sort("created_at", -1).to_list(SESSION_MEMORY_TURNS)
+        turns = session_memory.setdefault(session_id, deque(reversed(docs), maxlen=SESSION_MEMORY_TURNS))
+        if len(session_memory) > SESSION_MEMORY_MAX_SESSIONS:
+            session_memory.popitem(last=False)
+    return turns
+
+
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat_endpoint(req: ChatRequest):
     """RAG-powered chat with multi-turn memory, citations, reasoning steps, and MLFlow tracking."""
     session_id = req.session_id or f"chat_{uuid.uuid4().hex[:8]}"
-    run_id = None
 
     reasoning_steps = []
     citations = []
 
-    try:
-        # Start MLFlow run
-        run = start_mlflow_run(
-            run_name=f"chat_{session_id[:12]}",
-            tags={"type": "rag_chat", "session_id": session_id},
-        )
-        run_id = run.info.run_id
-        mlflow.log_param("user_query", req.message[:250])
-        mlflow.log_param("session_id", session_id)
-    except Exception:
-        pass  # MLFlow is best-effort
+    # Start MLFlow run
+    run_id = await start_mlflow_run(
+        run_name=f"chat_{session_id[:12]}",
+        tags={"type": "rag_chat", "session_id": session_id},
+    )
+    record = MlflowRecord(params={"user_query": req.message[:250], "session_id": session_id})
 
     # Step 1: Query analysis
     t0 = time.time()
@@ -538,16 +890,11 @@ async def chat_endpoint(req: ChatRequest):
         "detail": f"Analyzing user query: '{req.message}'",
         "data_used": "User input",
     })
-    try:
-        log_agent_step(1, "Query Analysis", f"Query: {req.message}", "User input", 0)
-    except Exception:
-        pass
+    log_agent_step(record, 1, "Query Analysis", f"Query: {req.message}", "User input", 0)
 
     # Step 2: Retrieve conversation history (multi-turn memory)
-    history_docs = await db.chat_history.find(
-        {"session_id": session_id}, {"_id": 0}
-    ).sort("created_at", -1).to_list(5)
-    history_docs.reverse()
+    session_turns = await get_session_memory(session_id)
+    history_docs = list(session_turns)
 
     conversation_context = ""
     if history_docs:
@@ -558,10 +905,7 @@ async def chat_endpoint(req: ChatRequest):
             "detail": f"Loaded {len(history_docs)} previous conversation turns for context",
             "data_used": f"{len(history_docs)} chat history messages",
         })
-        try:
-            log_agent_step(2, "Memory Retrieval", f"{len(history_docs)} turns loaded", f"session={session_id}", (time.time() - t0) * 1000)
-        except Exception:
-            pass
+        log_agent_step(record, 2, "Memory Retrieval", f"{len(history_docs)} turns loaded", f"session={session_id}", (time.time() - t0) * 1000)
     else:
         reasoning_steps.append({
             "step": 2, "action": "Memory Retrieval",
@@ -579,12 +923,8 @@ async def chat_endpoint(req: ChatRequest):
         "detail": f"Retrieved {len(search_results)} documents in {search_ms:.0f}ms using sentence-transformers embeddings",
         "data_used": [r["facility_id"] for r in search_results],
     })
-    try:
-        log_agent_step(3, "Semantic Search", f"{len(search_results)} docs, {search_ms:.0f}ms", str([r["facility_id"] for r in search_results]), search_ms)
-        mlflow.log_metric("faiss_search_ms", search_ms)
-        mlflow.log_metric("docs_retrieved", len(search_results))
-    except Exception:
-        pass
+    log_agent_step(record, 3, "Semantic Search", f"{len(search_results)} docs, {search_ms:.0f}ms", str([r["facility_id"] for r in search_results]), search_ms)
+    record.metrics.update(faiss_search_ms=search_ms, docs_retrieved=len(search_results))
 
     # Build context + citations
     context_parts = []
@@ -599,9 +939,6 @@ async def chat_endpoint(req: ChatRequest):
     context = "\n\n---\n\n".join(context_parts)
 
     # Step 4: Context assembly
-    all_facilities = await db.facilities.find({}, {"_id": 0, "name": 1, "region": 1}).to_list(5000)
-    facility_summary = f"Total: {len(all_facilities)} facilities across {len(set(f['region'] for f in all_facilities))} regions."
-
     reasoning_steps.append({
         "step": 4, "action": "Context Assembly",
         "detail": f"Combined {len(search_results)} retrieved docs + {len(history_docs)} conversation turns + DB summary",
@@ -650,12 +987,8 @@ INSTRUCTIONS:
             "detail": f"Generated response in {llm_ms:.0f}ms using {len(context_parts)} context documents + conversation memory",
             "data_used": f"System prompt + {len(context_parts)} docs + {len(history_docs)} memory turns",
         })
-        try:
-            log_agent_step(5, "LLM Generation", f"Generated in {llm_ms:.0f}ms", f"{len(context_parts)} docs", llm_ms)
-            mlflow.log_metric("llm_latency_ms", llm_ms)
-            mlflow.log_metric("response_length", len(response_text))
-        except Exception:
-            pass
+        log_agent_step(record, 5, "LLM Generation", f"Generated in {llm_ms:.0f}ms", f"{len(context_parts)} docs", llm_ms)
+        record.metrics.update(llm_latency_ms=llm_ms, response_length=len(response_text))
 
     except Exception as e:
         response_text = f"Error processing query: {str(e)}. Found {len(search_results)} relevant records."
@@ -674,19 +1007,15 @@ INSTRUCTIONS:
         "mlflow_run_id": run_id,
         "created_at": datetime.now(timezone.utc),
     })
+    session_turns.append({"message": req.message, "response": response_text})
 
     # End MLFlow run
-    try:
-        total_ms = (time.time() - t0) * 1000
-        mlflow.log_metric("total_latency_ms", total_ms)
-        mlflow.log_metric("citation_count", len(citations))
-        mlflow.log_metric("reasoning_steps_count", len(reasoning_steps))
-        mlflow.end_run()
-    except Exception:
-        try:
-            mlflow.end_run()
-        except Exception:
-            pass
+    record.metrics.update(
+        total_latency_ms=(time.time() - t0) * 1000,
+        citation_count=len(citations),
+        reasoning_steps_count=len(reasoning_steps),
+    )
+    finish_mlflow_run(run_id, record)
 
     return ChatResponse(
         response=response_text,
@@ -712,17 +1041,14 @@ async def get_chat_history(session_id: str):
 @app.post("/api/text2sql", response_model=Text2SQLResponse)
 async def text2sql_endpoint(req: Text2SQLRequest):
     """Convert natural language to MongoDB query and execute it."""
-    try:
-        # Start MLFlow run for tracking
-        try:
-            run = start_mlflow_run(
-                run_name=f"text2sql_{uuid.uuid4().hex[:8]}",
-                tags={"type": "text2sql"},
-            )
-            mlflow.log_param("natural_query", req.query[:250])
-        except Exception:
-            pass
+    # Start MLFlow run for tracking
+    run_id = await start_mlflow_run(
+        run_name=f"text2sql_{uuid.uuid4().hex[:8]}",
+        tags={"type": "text2sql"},
+    )
+    record = MlflowRecord(params={"natural_query": req.query[:250]})
 
+    try:
         t0 = time.time()
         query_spec = await text_to_mongo_query(req.query)
         llm_ms = (time.time() - t0) * 1000
@@ -731,6 +1057,8 @@ async def text2sql_endpoint(req: Text2SQLRequest):
         projection = query_spec.get("projection", {"_id": 0})
         if "_id" not in projection:
             projection["_id"] = 0
+        if not any(v for k, v in projection.items() if k != "_id"):
+            projection.update(FACILITY_LC_FIELDS)
         sort_spec = query_spec.get("sort", None)
         limit = min(query_spec.get("limit", 20), 50)
         explanation = query_spec.get("explanation", "")
@@ -740,16 +1068,8 @@ async def text2sql_endpoint(req: Text2SQLRequest):
             cursor = cursor.sort(list(sort_spec.items()))
         results = await cursor.to_list(limit)
 
-        try:
-            mlflow.log_metric("text2sql_latency_ms", llm_ms)
-            mlflow.log_metric("result_count", len(results))
-            mlflow.log_param("mongo_filter", json.dumps(mongo_filter)[:250])
-            mlflow.end_run()
-        except Exception:
-            try:
-                mlflow.end_run()
-            except Exception:
-                pass
+        record.params["mongo_filter"] = orjson.dumps(mongo_filter).decode()[:250]
+        record.metrics.update(text2sql_latency_ms=llm_ms, result_count=len(results))
 
         return Text2SQLResponse(
             natural_query=req.query,
@@ -759,18 +1079,12 @@ async def text2sql_endpoint(req: Text2SQLRequest):
             explanation=explanation,
         )
 
-    except json.JSONDecodeError:
-        try:
-            mlflow.end_run()
-        except Exception:
-            pass
+    except orjson.JSONDecodeError:
         raise HTTPException(status_code=422, detail="Failed to parse LLM response into MongoDB query. Try rephrasing.")
     except Exception as e:
-        try:
-            mlflow.end_run()
-        except Exception:
-            pass
         raise HTTPException(status_code=500, detail=f"Text2SQL error: {str(e)}")
+    finally:
+        finish_mlflow_run(run_id, record)
 
 
 # ══════════════════════════════════════════════
@@ -822,52 +1136,126 @@ async def get_mlflow_runs(limit: int = 20):
 # PLANNING SYSTEM
 # ══════════════════════════════════════════════
 
-@app.post("/api/planning/generate")
-async def generate_plan(req: PlanRequest):
-    query = {}
-    if req.region:
-        query["region"] = {"$regex": req.region, "$options": "i"}
-
-    facilities = await db.facilities.find(query, {"_id": 0}).to_list(5000)
-
-    region_summaries = {}
-    for fac in facilities:
-        region = fac["region"]
-        if region not in region_summaries:
-            region_summaries[region] = {
-                "count": 0, "total_beds": 0, "total_staff": 0,
-                "types": {}, "deserts": 0, "key_facilities": [],
-            }
-        rs = region_summaries[region]
-        rs["count"] += 1
-        rs["total_beds"] += fac.get("beds", 0)
-        rs["total_staff"] += fac.get("staff_count", 0)
-        t = fac["type"]
-        rs["types"][t] = rs["types"].get(t, 0) + 1
-        if "MEDICAL DESERT" in fac.get("notes", ""):
-            rs["deserts"] += 1
-        if fac.get("beds", 0) > 100 or "Critical" in fac.get("operational_status", "") or fac["type"] in ("Teaching Hospital", "Regional Hospital"):
-            rs["key_facilities"].append(
-                f"{fac['name']} ({fac['type']}, {fac['beds']} beds, {fac['staff_count']} staff, {fac['operational_status']})"
-            )
+KEY_FACILITY_TYPES = ("Teaching Hospital", "Regional Hospital")
+KEY_FACILITIES_PER_REGION = 10
+
+
+@dataclass(slots=True)
+class RegionSummary:
+    count: int = 0
+    total_beds: int = 0
+    total_staff: int = 0
+    deserts: int = 0
+    types: dict = field(default_factory=dict)
+    key_facilities: list = field(default_factory=list)
+
+
+def summarize_regions(facilities: list) -> dict[str, RegionSummary]:
+    """Per-region counts and key facilities used as the planning prompt's context."""
+    df = pd.DataFrame(facilities, columns=["name", "region", "type", "beds", "staff_count", "operational_status", "notes"])
+    df[["beds", "staff_count"]] = df[["beds", "staff_count"]].fillna(0).astype(int)
+    df[["operational_status", "notes"]] = df[["operational_status", "notes"]].fillna("")
+    df["is_desert"] = df["notes"].str.contains("MEDICAL DESERT", regex=False)
+    df["is_key"] = (
+        (df["beds"] > 100)
+        | df["operational_status"].str.contains("Critical", regex=False)
+        | df["type"].isin(KEY_FACILITY_TYPES)
+    )
+
+    by_region = df.groupby("region", sort=False)
+    totals = by_region.agg(
+        count=("name", "size"), total_beds=("beds", "sum"),
+        total_staff=("staff_count", "sum"), deserts=("is_desert", "sum"),
+    )
+    type_counts = df.groupby(["region", "type"], sort=False).size()
+    # Only the first KEY_FACILITIES_PER_REGION per region reach the prompt; format just those
+    key = df[df["is_key"]].groupby("region", sort=False).head(KEY_FACILITIES_PER_REGION)
+    key_labels = (
+        key["name"] + " (" + key["type"] + ", " + key["beds"].astype(str) + " beds, "
+        + key["staff_count"].astype(str) + " staff, " + key["operational_status"] + ")"
+    ).groupby(key["region"], sort=False).agg(list)
+
+    return {
+        region: RegionSummary(
+            count=count, total_beds=total_beds, total_staff=total_staff, deserts=deserts,
+            types=dict(type_counts[region].items()), key_facilities=key_labels.get(region, []),
+        )
+        for region, count, total_beds, total_staff, deserts in totals.itertuples(name=None)
+    }
 
-    facility_context = ""
-    for region, rs in region_summaries.items():
-        facility_context += f"\n{region}: {rs['count']} facilities, {rs['total_beds']} beds, {rs['total_staff']} staff, {rs['deserts']} deserts\n"
-        facility_context += f"  Types: {rs['types']}\n"
-        if rs["key_facilities"]:
-            facility_context += f"  Key facilities: {'; '.join(rs['key_facilities'][:10])}\n"
 
-    prompt = f"""Based on Ghana healthcare data, generate a resource allocation plan.
+# Generated plans are reused for identical requests for this long (Mongo TTL index)
+PLAN_CACHE_TTL_S = 86400
+
+# Near-duplicate requests (cosine >= PLAN_SEMANTIC_HIT) reuse a cached plan.
+# Process-local, newest PLAN_SEMANTIC_MAX_ENTRIES kept.
+PLAN_SEMANTIC_HIT = 0.95
+PLAN_SEMANTIC_MAX_ENTRIES = 1000
+plan_cache_index = None
+plan_cache_entries = []
+
+
+def plan_request_text(req: PlanRequest) -> str:
+    return " | ".join(" ".join((v or "").lower().split()) for v in (req.region, req.specialty, req.description))
+
+
+def plan_cache_key(req: PlanRequest) -> str:
+    return hashlib.sha256(plan_request_text(req).encode()).hexdigest()
+
+
+def find_similar_plan(query_vec: np.ndarray):
+    """Closest fresh cached plan entry and its cosine score, or (None, 0.0)."""
+    if plan_cache_index is None or plan_cache_index.ntotal == 0:
+        return None, 0.0
+    scores, indices = plan_cache_index.search(query_vec, 1)
+    entry = plan_cache_entries[indices[0][0]]
+    if time.monotonic() - entry["cached_at"] > PLAN_CACHE_TTL_S:
+        return None, 0.0
+    return entry, float(scores[0][0])
+
+
+def remember_plan(query_vec: np.ndarray, plan_doc: dict):
+    global plan_cache_index, plan_cache_entries
+    if plan_cache_index is None or len(plan_cache_entries) >= PLAN_SEMANTIC_MAX_ENTRIES:
+        plan_cache_entries = plan_cache_entries[-(PLAN_SEMANTIC_MAX_ENTRIES // 2):]
+        plan_cache_index = faiss.IndexFlatIP(EMBED_DIM)
+        if plan_cache_entries:
+            plan_cache_index.add(np.vstack([e["vec"] for e in plan_cache_entries]))
+    plan_cache_entries.append({
+        "vec": query_vec, "plan": plan_doc, "cached_at": time.monotonic(),
+    })
+    plan_cache_index.add(query_vec)
+
+
+PLAN_SYSTEM_MESSAGE = "You are a healthcare resource planning expert for the Virtue Foundation, focused on Ghana. Generate concise, actionable plans."
+
+
+# Everything except the specialty/description goes in the system prompt, so
+# requests for the same region share a byte-identical prefix the provider can
+# cache. Cleared whenever region_summaries is rebuilt.
+@functools.lru_cache(maxsize=64)
+def plan_system_message(region: Optional[str]) -> str:
+    """System prompt for a region focus: instructions plus the regional summary."""
+    summaries = region_summaries
+    if region:
+        region_pattern = re.compile(region, re.IGNORECASE)
+        summaries = {name: rs for name, rs in region_summaries.items() if region_pattern.search(name)}
+
+    parts = []
+    for name, rs in summaries.items():
+        parts.append(f"\n{name}: {rs.count} facilities, {rs.total_beds} beds, {rs.total_staff} staff, {rs.deserts} deserts\n")
+        parts.append(f"  Types: {rs.types}\n")
+        if rs.key_facilities:
+            parts.append(f"  Key facilities: {'; '.join(rs.key_facilities)}\n")
+    facility_context = "".join(parts)
+
+    return f"""{PLAN_SYSTEM_MESSAGE}
+
+Based on Ghana healthcare data, generate a resource allocation plan for the user's request.
 
 REGIONAL SUMMARY:
 {facility_context}
 
-USER REQUEST:
-Region focus: {req.region or 'All regions'}
-Specialty focus: {req.specialty or 'General'}
-Additional context: {req.description or 'None provided'}
-
 Generate a concise plan that:
 1. Identifies the most critical gaps
 2. Prioritizes actions by urgency (P0, P1, P2)
@@ -877,30 +1265,79 @@ Generate a concise plan that:
 
 Format clearly with sections and bullet points."""
 
+
+def build_plan_request(req: PlanRequest) -> str:
+    return f"""USER REQUEST:
+Region focus: {req.region or 'All regions'}
+Specialty focus: {req.specialty or 'General'}
+Additional context: {req.description or 'None provided'}"""
+
+
+def new_plan_chat(req: PlanRequest) -> LlmChat:
+    # Same (region, specialty) -> same session id, so provider-side caching can match requests
+    focus = f"{(req.region or '').lower()}|{(req.specialty or '').lower()}"
+    chat = LlmChat(
+        api_key=EMERGENT_LLM_KEY,
+        session_id=f"plan_{hashlib.blake2b(focus.encode(), digest_size=4).hexdigest()}",
+        system_message=plan_system_message(req.region),
+    )
+    chat.with_model("gemini", "gemini-2.5-flash")
+    return chat
+
+
+async def find_cached_plan(req: PlanRequest, request_vec: np.ndarray) -> Optional[dict]:
+    """Exact Mongo cache first, then the semantic cache."""
+    cached = await db.plan_cache.find_one(
+        {"key": plan_cache_key(req), "created_at": {"$gt": datetime.now(timezone.utc) - timedelta(seconds=PLAN_CACHE_TTL_S)}},
+        {"_id": 0, "key": 0},
+    )
+    if cached:
+        return cached
+
+    similar, score = find_similar_plan(request_vec)
+    if similar and score >= PLAN_SEMANTIC_HIT:
+        # Reuse the plan, but echo back the request fields the caller sent
+        return {**similar["plan"], "region": req.region, "specialty": req.specialty, "description": req.description}
+    return None
+
+
+async def persist_plan(plan_id: str, cache_key: str, plan_doc: dict):
     try:
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"plan_{uuid.uuid4().hex[:8]}",
-            system_message="You are a healthcare resource planning expert for the Virtue Foundation, focused on Ghana. Generate concise, actionable plans.",
-        )
-        chat.with_model("gemini", "gemini-2.5-flash")
+        # plan_id doubles as _id so Mongo neither generates an ObjectId nor adds one to plan_doc
+        await db.plans.insert_one({"_id": plan_id, **plan_doc}, bypass_document_validation=True)
+        await db.plan_cache.update_one({"key": cache_key}, {"$set": plan_doc}, upsert=True)
+    except Exception as e:
+        print(f"Failed to store plan {plan_id}: {e}")
 
-        user_msg = UserMessage(text=prompt)
-        plan_text = await chat.send_message(user_msg)
 
-        plan_id = f"plan_{uuid.uuid4().hex[:8]}"
-        plan_doc = {
-            "plan_id": plan_id,
-            "region": req.region,
-            "specialty": req.specialty,
-            "description": req.description,
-            "plan_text": plan_text,
-            "created_at": datetime.now(timezone.utc),
-        }
-        await db.plans.insert_one(plan_doc)
-        del plan_doc["_id"]
+def save_plan(req: PlanRequest, plan_id: str, plan_text: str, request_vec: np.ndarray) -> dict:
+    """Cache a generated plan and store it in the history without waiting on Mongo."""
+    plan_doc = {
+        "plan_id": plan_id,
+        "region": req.region,
+        "specialty": req.specialty,
+        "description": req.description,
+        "plan_text": plan_text,
+        "created_at": datetime.now(timezone.utc),
+    }
+    remember_plan(request_vec, plan_doc)
+    # The response already carries the plan; shutdown awaits pending writes
+    task = asyncio.create_task(persist_plan(plan_id, plan_cache_key(req), plan_doc))
+    app.state.pending_writes.add(task)
+    task.add_done_callback(app.state.pending_writes.discard)
+    return plan_doc
 
-        return plan_doc
+
+@app.post("/api/planning/generate")
+async def generate_plan(req: PlanRequest):
+    request_vec = encode_query(plan_request_text(req))
+    cached = await find_cached_plan(req, request_vec)
+    if cached:
+        return cached
+
+    try:
+        plan_text = await new_plan_chat(req).send_message(UserMessage(text=build_plan_request(req)))
+        return save_plan(req, f"plan_{uuid.uuid4().hex[:8]}", plan_text, request_vec)
     except Exception as e:
         error_msg = str(e)
         if "budget" in error_msg.lower():
@@ -908,28 +1345,85 @@ Format clearly with sections and bullet points."""
         raise HTTPException(status_code=500, detail=f"Plan generation error: {error_msg}")
 
 
+# History rows omit plan_text; the full plan is fetched by id when opened
+PLAN_SUMMARY_PROJECTION = {"_id": 0, "plan_id": 1, "region": 1, "specialty": 1, "description": 1, "created_at": 1}
+
+
 @app.get("/api/planning/history")
 async def get_plan_history():
-    plans = await db.plans.find({}, {"_id": 0}).sort("created_at", -1).to_list(20)
+    plans = await db.plans.find({}, PLAN_SUMMARY_PROJECTION).sort("created_at", -1).to_list(20)
     return plans
 
 
+@app.get("/api/planning/{plan_id}")
+async def get_plan(plan_id: str):
+    plan = await db.plans.find_one({"_id": plan_id}, {"_id": 0})
+    if not plan:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    return plan
+
+
 # ══════════════════════════════════════════════
 # STARTUP & HEALTH
 # ══════════════════════════════════════════════
 
+async def ensure_indexes():
+    """Create indexes for the hot facility filters, session lookups, chat and plan history, and the plan cache."""
+    await db.facilities.create_index([("region", 1)])
+    await db.facilities.create_index([("type", 1)])
+    await db.facilities.create_index([("specialties", 1)])
+    await db.facilities.create_index([("facility_id", 1)])
+    await db.facilities.create_index([("region_lc", 1)])
+    await db.facilities.create_index([("type_lc", 1)])
+    await db.facilities.create_index([("specialties_lc", 1)])
+    await db.user_sessions.create_index([("session_token", 1)])
+    await db.users.create_index([("user_id", 1)])
+    await db.chat_history.create_index([("session_id", 1), ("created_at", -1)])
+    await db.plans.create_index([("created_at", -1)])
+    await db.plan_cache.create_index([("key", 1)], unique=True)
+    await db.plan_cache.create_index([("created_at", 1)], expireAfterSeconds=PLAN_CACHE_TTL_S)
+
+
 @app.on_event("startup")
 async def startup():
+    global search_queue
+    faiss.omp_set_num_threads(os.cpu_count() or 1)
+    torch.set_num_threads(os.cpu_count() or 1)
     await build_faiss_index()
+    # Load (and compile) the encoder now even when embeddings came from the cache
+    get_embed_model()
+    await add_lowercase_fields()
+    await ensure_indexes()
+    await cache_facilities_payload()
+    await refresh_analysis_views()
+    search_queue = asyncio.Queue()
+    app.state.search_batcher = asyncio.create_task(search_batcher())
+    app.state.pending_writes = set()
     print("Application started. FAISS index ready with sentence-transformers embeddings.")
 
 
-@app.get("/api/health")
-async def health():
-    return {
+@app.on_event("shutdown")
+async def shutdown():
+    global search_queue
+    # Any search still arriving falls back to a direct index.search
+    search_queue = None
+    app.state.search_batcher.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await app.state.search_batcher
+    if app.state.pending_writes:
+        await asyncio.gather(*app.state.pending_writes)
+
+
+def build_health_payload() -> bytes:
+    return orjson.dumps({
         "status": "ok",
         "faiss_index_size": faiss_index.ntotal if faiss_index else 0,
-        "embed_model": "all-MiniLM-L6-v2",
+        "embed_model": EMBED_MODEL_NAME,
         "embed_dim": EMBED_DIM,
         "features": ["sentence-transformers", "mlflow", "text2sql", "multi-turn-memory"],
-    }
+    })
+
+
+@app.get("/api/health")
+async def health():
+    return Response(content=health_json or build_health_payload(), media_type="application/json")
@@ -1,13 +1,14 @@
 #!/usr/bin/env python3
-import requests
+import asyncio
+import httpx
 import json
 import sys
-import time
 from datetime import datetime
 
 class VirtueFoundationAPITester:
     def __init__(self, base_url="https://f91285f2-1ee7-401d-8ea3-0f3be5d4caca.preview.emergentagent.com"):
         self.base_url = base_url
+        self.client = None
         self.session_token = None
         self.tests_run = 0
         self.tests_passed = 0
@@ -23,9 +24,8 @@ class VirtueFoundationAPITester:
             self.failed_tests.append({"test": test_name, "details": details})
             print(f"❌ {test_name}: FAILED {details}")
 
-    def run_api_test(self, method, endpoint, expected_status, data=None, headers=None):
-        """Run a single API test"""
-        url = f"{self.base_url}{endpoint}"
+    async def run_api_test(self, method, endpoint, expected_status, data=None, headers=None):
+        """Run a single API test over the shared pooled client"""
         if headers is None:
             headers = {'Content-Type': 'application/json'}
         
@@ -33,14 +33,10 @@ class VirtueFoundationAPITester:
             headers['Authorization'] = f'Bearer {self.session_token}'
 
         try:
-            if method == 'GET':
-                response = requests.get(url, headers=headers, timeout=10)
-            elif method == 'POST':
-                response = requests.post(url, json=data, headers=headers, timeout=10)
-            elif method == 'PUT':
-                response = requests.put(url, json=data, headers=headers, timeout=10)
-            elif method == 'DELETE':
-                response = requests.delete(url, headers=headers, timeout=10)
+            if method in ('POST', 'PUT'):
+                response = await self.client.request(method, endpoint, json=data, headers=headers)
+            else:
+                response = await self.client.request(method, endpoint, headers=headers)
 
             success = response.status_code == expected_status
             content = response.text[:200] if response.text else ""
@@ -55,10 +51,10 @@ class VirtueFoundationAPITester:
         except Exception as e:
             return False, {}, 0, str(e)
 
-    def test_health_endpoint(self):
+    async def test_health_endpoint(self):
         """Test health endpoint with features list"""
         print(f"\n🔍 Testing Health Endpoint...")
-        success, response, status, content = self.run_api_test('GET', '/api/health', 200)
+        success, response, status, content = await self.run_api_test('GET', '/api/health', 200)
         
         if success:
             faiss_size = response.get('faiss_index_size', 0)
@@ -74,12 +70,12 @@ class VirtueFoundationAPITester:
         else:
             self.log_result("Health endpoint", False, f"Status: {status}, Content: {content}")
 
-    def test_facilities_api(self):
+    async def test_facilities_api(self):
         """Test facilities API"""
         print(f"\n🔍 Testing Facilities API...")
         
         # Basic facilities endpoint
-        success, response, status, content = self.run_api_test('GET', '/api/facilities', 200)
+        success, response, status, content = await self.run_api_test('GET', '/api/facilities', 200)
         if success and isinstance(response, list):
             facility_count = len(response)
             self.log_result("Facilities API", True, f"Returned {facility_count} facilities")
@@ -88,17 +84,17 @@ class VirtueFoundationAPITester:
             return
 
         # Facilities with region filter
-        success, response, status, content = self.run_api_test('GET', '/api/facilities?region=Northern', 200)
+        success, response, status, content = await self.run_api_test('GET', '/api/facilities?region=Northern', 200)
         if success and isinstance(response, list):
             northern_count = len(response)
             self.log_result("Facilities API with region filter", True, f"Returned {northern_count} Northern region facilities")
         else:
             self.log_result("Facilities API with region filter", False, f"Status: {status}, Content: {content}")
 
-    def test_stats_api(self):
+    async def test_stats_api(self):
         """Test stats API returns 3530 facilities"""
         print(f"\n🔍 Testing Stats API...")
-        success, response, status, content = self.run_api_test('GET', '/api/analysis/stats', 200)
+        success, response, status, content = await self.run_api_test('GET', '/api/analysis/stats', 200)
         
         if success:
             total_facilities = response.get('total_facilities', 0)
@@ -110,10 +106,10 @@ class VirtueFoundationAPITester:
         else:
             self.log_result("Stats API", False, f"Status: {status}, Content: {content}")
 
-    def test_medical_deserts_api(self):
+    async def test_medical_deserts_api(self):
         """Test medical deserts analysis API"""
         print(f"\n🔍 Testing Medical Deserts API...")
-        success, response, status, content = self.run_api_test('GET', '/api/analysis/medical-deserts', 200)
+        success, response, status, content = await self.run_api_test('GET', '/api/analysis/medical-deserts', 200)
         
         if success and isinstance(response, list):
             desert_regions = len(response)
@@ -127,7 +123,29 @@ class VirtueFoundationAPITester:
         else:
             self.log_result("Medical Deserts API", False, f"Status: {status}, Content: {content}")
 
-    def test_multi_turn_memory(self):
+    async def test_dashboard_api(self):
+        """Test dashboard API bundles stats and medical deserts"""
+        print(f"\n🔍 Testing Dashboard API...")
+        success, response, status, content = await self.run_api_test('GET', '/api/analysis/dashboard', 200)
+        
+        if success:
+            total_facilities = response.get('stats', {}).get('total_facilities', 0)
+            deserts = response.get('medical_deserts')
+            
+            if total_facilities == 3530:
+                self.log_result("Dashboard API stats", True, f"total_facilities={total_facilities}")
+            else:
+                self.log_result("Dashboard API stats", False, f"Expected 3530 facilities, got {total_facilities}")
+            
+            ok, expected, _, _ = await self.run_api_test('GET', '/api/analysis/medical-deserts', 200)
+            if isinstance(deserts, list) and deserts and ok and deserts == expected:
+                self.log_result("Dashboard API deserts", True, f"{len(deserts)} regions, matches /api/analysis/medical-deserts")
+            else:
+                self.log_result("Dashboard API deserts", False, "medical_deserts empty or differs from /api/analysis/medical-deserts")
+        else:
+            self.log_result("Dashboard API", False, f"Status: {status}, Content: {content}")
+
+    async def test_multi_turn_memory(self):
         """Test multi-turn chat memory"""
         print(f"\n🔍 Testing Multi-turn Memory...")
         session_id = "test_multi_turn_session"
@@ -138,14 +156,14 @@ class VirtueFoundationAPITester:
             "session_id": session_id
         }
         
-        success1, response1, status1, content1 = self.run_api_test('POST', '/api/chat', 200, test_data1)
+        success1, response1, status1, content1 = await self.run_api_test('POST', '/api/chat', 200, test_data1)
         
         if not success1:
             self.log_result("Multi-turn Memory (first message)", False, f"Status: {status1}, Content: {content1}")
             return
         
         # Wait a moment for the conversation to be stored
-        time.sleep(2)
+        await asyncio.sleep(2)
         
         # Second message in same session
         test_data2 = {
@@ -153,7 +171,7 @@ class VirtueFoundationAPITester:
             "session_id": session_id
         }
         
-        success2, response2, status2, content2 = self.run_api_test('POST', '/api/chat', 200, test_data2)
+        success2, response2, status2, content2 = await self.run_api_test('POST', '/api/chat', 200, test_data2)
         
         if success2:
             reasoning_steps = response2.get('reasoning_steps', [])
@@ -172,14 +190,14 @@ class VirtueFoundationAPITester:
         else:
             self.log_result("Multi-turn Memory (second message)", False, f"Status: {status2}, Content: {content2}")
 
-    def test_text2sql_api(self):
+    async def test_text2sql_api(self):
         """Test Text2SQL API"""
         print(f"\n🔍 Testing Text2SQL API...")
         test_data = {
             "query": "Find teaching hospitals with more than 500 beds"
         }
         
-        success, response, status, content = self.run_api_test('POST', '/api/text2sql', 200, test_data)
+        success, response, status, content = await self.run_api_test('POST', '/api/text2sql', 200, test_data)
         
         if success:
             has_mongo_query = 'mongo_query' in response
@@ -194,10 +212,10 @@ class VirtueFoundationAPITester:
         else:
             self.log_result("Text2SQL API", False, f"Status: {status}, Content: {content}")
 
-    def test_mlflow_runs_api(self):
+    async def test_mlflow_runs_api(self):
         """Test MLFlow runs API"""
         print(f"\n🔍 Testing MLFlow Runs API...")
-        success, response, status, content = self.run_api_test('GET', '/api/mlflow/runs', 200)
+        success, response, status, content = await self.run_api_test('GET', '/api/mlflow/runs', 200)
         
         if success:
             if isinstance(response, list):
@@ -220,7 +238,7 @@ class VirtueFoundationAPITester:
         else:
             self.log_result("MLFlow Runs API", False, f"Status: {status}, Content: {content}")
 
-    def test_chat_rag_api(self):
+    async def test_chat_rag_api(self):
         """Test Chat RAG API with citations, reasoning steps, and MLFlow run ID"""
         print(f"\n🔍 Testing Chat RAG API...")
         test_data = {
@@ -228,7 +246,7 @@ class VirtueFoundationAPITester:
             "session_id": "test_session_1"
         }
         
-        success, response, status, content = self.run_api_test('POST', '/api/chat', 200, test_data)
+        success, response, status, content = await self.run_api_test('POST', '/api/chat', 200, test_data)
         
         if success:
             has_response = 'response' in response and len(response['response']) > 0
@@ -249,7 +267,7 @@ class VirtueFoundationAPITester:
         else:
             self.log_result("Chat RAG API", False, f"Status: {status}, Content: {content}")
 
-    def test_planning_api(self):
+    async def test_planning_api(self):
         """Test Planning API"""
         print(f"\n🔍 Testing Planning API...")
         test_data = {
@@ -257,7 +275,7 @@ class VirtueFoundationAPITester:
             "specialty": "Surgery"
         }
         
-        success, response, status, content = self.run_api_test('POST', '/api/planning/generate', 200, test_data)
+        success, response, status, content = await self.run_api_test('POST', '/api/planning/generate', 200, test_data)
         
         if success:
             has_plan = 'plan_text' in response
@@ -265,11 +283,47 @@ class VirtueFoundationAPITester:
             
             if has_plan and has_id:
                 self.log_result("Planning API", True, f"Generated plan with ID: {response.get('plan_id', 'N/A')}")
+                await self.test_planning_history(response['plan_id'])
+                
+                # The same request again must be served from the plan cache
+                ok, repeat, status, content = await self.run_api_test('POST', '/api/planning/generate', 200, test_data)
+                if ok and repeat.get('plan_id') == response['plan_id']:
+                    self.log_result("Planning cache", True, f"Repeat request returned plan {response['plan_id']}")
+                else:
+                    self.log_result("Planning cache", False, f"Expected plan_id {response['plan_id']}, got {repeat.get('plan_id')} (status {status})")
             else:
                 self.log_result("Planning API", False, f"Missing fields: plan_text={has_plan}, plan_id={has_id}")
         else:
             self.log_result("Planning API", False, f"Status: {status}, Content: {content}")
 
+    async def test_planning_history(self, plan_id):
+        """Test plan history summaries and fetching a plan by id"""
+        print(f"\n🔍 Testing Planning History...")
+        # Plans are persisted in the background after the response, so allow a short delay
+        history, plan = [], {}
+        for _ in range(10):
+            ok, history, status, content = await self.run_api_test('GET', '/api/planning/history', 200)
+            found, plan, _, _ = await self.run_api_test('GET', f'/api/planning/{plan_id}', 200)
+            if ok and found and any(h.get('plan_id') == plan_id for h in history):
+                break
+            await asyncio.sleep(0.5)
+        
+        if isinstance(history, list) and history and all('plan_id' in h and 'plan_text' not in h for h in history):
+            self.log_result("Planning history", True, f"{len(history)} entries with plan_id and no plan_text")
+        else:
+            self.log_result("Planning history", False, f"Status: {status}, Content: {content}")
+        
+        if plan.get('plan_id') == plan_id and plan.get('plan_text'):
+            self.log_result("Planning fetch by id", True, f"Fetched plan {plan_id}")
+        else:
+            self.log_result("Planning fetch by id", False, f"Plan {plan_id} not returned with plan_text")
+        
+        success, _, status, content = await self.run_api_test('GET', '/api/planning/plan_does_not_exist', 404)
+        if success:
+            self.log_result("Planning unknown id", True, "Returned 404")
+        else:
+            self.log_result("Planning unknown id", False, f"Expected 404, got {status}")
+
     def create_test_session(self):
         """Create test session in MongoDB for auth testing"""
         print(f"\n🔧 Creating test session...")
@@ -321,7 +375,7 @@ class VirtueFoundationAPITester:
             
         return False
 
-    def test_auth_api(self):
+    async def test_auth_api(self):
         """Test Auth API with test session"""
         print(f"\n🔍 Testing Auth API...")
         
@@ -329,7 +383,7 @@ class VirtueFoundationAPITester:
             self.log_result("Auth API - no session", False, "Test session not created")
             return
             
-        success, response, status, content = self.run_api_test('GET', '/api/auth/me', 200)
+        success, response, status, content = await self.run_api_test('GET', '/api/auth/me', 200)
         
         if success:
             has_user_id = 'user_id' in response
@@ -343,7 +397,13 @@ class VirtueFoundationAPITester:
         else:
             self.log_result("Auth API", False, f"Status: {status}, Content: {content}")
 
-    def run_all_tests(self):
+    async def test_chat_flow(self):
+        """Chat tests in order; the MLFlow runs check needs the chat runs logged first"""
+        await self.test_chat_rag_api()
+        await self.test_multi_turn_memory()
+        await self.test_mlflow_runs_api()
+
+    async def run_all_tests(self):
         """Run all backend API tests"""
         print("=" * 60)
         print("🚀 VIRTUE FOUNDATION IDP - BACKEND API TESTS")
@@ -352,17 +412,20 @@ class VirtueFoundationAPITester:
         # Create test session first for auth-protected endpoints
         self.create_test_session()
         
-        # Run all tests
-        self.test_health_endpoint()
-        self.test_facilities_api()
-        self.test_stats_api()
-        self.test_medical_deserts_api()
-        self.test_chat_rag_api()
-        self.test_multi_turn_memory()
-        self.test_text2sql_api()
-        self.test_mlflow_runs_api()
-        self.test_planning_api()
-        self.test_auth_api()
+        # Run independent tests concurrently over one pooled connection set
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=10) as client:
+            self.client = client
+            await asyncio.gather(
+                self.test_health_endpoint(),
+                self.test_facilities_api(),
+                self.test_stats_api(),
+                self.test_medical_deserts_api(),
+                self.test_dashboard_api(),
+                self.test_chat_flow(),
+                self.test_text2sql_api(),
+                self.test_planning_api(),
+                self.test_auth_api(),
+            )
         
         # Summary
         print("\n" + "=" * 60)
@@ -383,5 +446,5 @@ class VirtueFoundationAPITester:
 
 if __name__ == "__main__":
     tester = VirtueFoundationAPITester()
-    success = tester.run_all_tests()
+    success = asyncio.run(tester.run_all_tests())
     sys.exit(0 if success else 1)
\ No newline at end of file
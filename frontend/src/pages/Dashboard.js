@@ -30,12 +30,10 @@ export default function Dashboard() {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [statsRes, desertsRes] = await Promise.all([
-          fetch(`${API_URL}/api/analysis/stats`, { credentials: 'include' }),
-          fetch(`${API_URL}/api/analysis/medical-deserts`, { credentials: 'include' }),
-        ]);
-        setStats(await statsRes.json());
-        setDeserts(await desertsRes.json());
+        const res = await fetch(`${API_URL}/api/analysis/dashboard`, { credentials: 'include' });
+        const data = await res.json();
+        setStats(data.stats);
+        setDeserts(data.medical_deserts);
       } catch (err) {
         console.error('Dashboard fetch error:', err);
       } finally {
@@ -60,6 +60,13 @@ export default function PlanningView() {
     }
   };
 
+  const openPlan = async (id) => {
+    try {
+      const res = await fetch(`${API_URL}/api/planning/${id}`, { credentials: 'include' });
+      if (res.ok) setPlan(await res.json());
+    } catch (err) { console.error(err); }
+  };
+
   return (
     <div data-testid="planning-page" className="p-6 space-y-6">
       <div className="flex items-center justify-between">
@@ -188,7 +195,7 @@ export default function PlanningView() {
                 {history.map((h, i) => (
                   <button
                     key={i}
-                    onClick={() => setPlan(h)}
+                    onClick={() => openPlan(h.plan_id)}
                     className="w-full text-left px-3 py-2 bg-slate-800/50 border border-slate-700/30 rounded-lg hover:bg-slate-800 transition-colors"
                   >
                     <div className="flex items-center gap-2 text-xs">